@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 import argparse
+import functools
+import hashlib
 import subprocess
 import sys
 import os
 import logging
+import re
+import stat
 
 # --- Virtual Environment Check ---
 # Ensure the script is running in a venv.
@@ -20,9 +24,6 @@ if sys.prefix == sys.base_prefix:
     sys.exit(1)
 # --- End Check ---
 
-import yaml
-import time
-import jinja2
 import shlex
 
 # Configure logging
@@ -38,15 +39,36 @@ ANSIBLE_DIR = os.path.join(PROJECT_ROOT, "ansible")
 DYN_INVENTORY_PATH = os.path.join(ANSIBLE_DIR, "inventory.dyn")
 DYN_INVENTORY_RELATIVE_PATH = "ansible/inventory.dyn"
 HARDWARE_VERSION_FILE = os.path.join(PROJECT_ROOT, ".hardware_version")
+RSYNC_IGNORE_FILE = os.path.join(PROJECT_ROOT, ".rsyncignore")
+# Directories excluded by .rsyncignore that are also left out of the tree signature
+SIGNATURE_SKIP_DIRS = {".git", ".venv", "__pycache__"}
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "onedotzero")
+# Signature of the tree last synced to a remote host, kept next to (not inside)
+# REMOTE_DIR so rsync --delete leaves it alone
+REMOTE_SIGNATURE_FILE = "~/remote/.odz_sync_signature"
 ANSIBLE_TESTING_HOST = "odz_test"
+# Matches the "<host> | <STATUS>" prefix of each host's line in ansible -o output
+PING_RESULT_RE = re.compile(r"^(\S+)\s+\|\s+(SUCCESS|UNREACHABLE|FAILED)\b", re.MULTILINE)
+# Separates the found test directories from the find output in ansible_test's lookup
+LOOKUP_SEPARATOR = "--"
 SSH_CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".ssh", "config")
-
-# Global var to hold hardware config
-HARDWARE_CONFIG = None
+# ssh/rsync calls share one connection per host through a control socket here,
+# so only the first call of a command pays for the tcp + key exchange + auth.
+# It lives in the user's private ~/.ssh rather than a guessable path in /tmp.
+SSH_CONTROL_DIR = os.path.join(os.path.expanduser("~"), ".ssh", "odz-control")
+SSH_MULTIPLEX_OPTIONS = [
+    "-o", "ControlMaster=auto",
+    "-o", "ControlPersist=600s",
+    "-o", f"ControlPath={SSH_CONTROL_DIR}/%r@%h:%p",
+]
+
+# Remote hosts the project tree has already been synced to by this invocation
+SYNCED_REMOTE_HOSTS = set()
 
 # --- Helper Functions ---
 
 
+@functools.lru_cache(maxsize=1)
 def get_hardware_version():
     """Gets the currently configured hardware version."""
     try:
@@ -60,12 +82,21 @@ def get_hardware_version():
         sys.exit(1)
 
 
+def load_yaml(path):
+    """Loads a YAML file, with the libyaml based loader when PyYAML was built with it."""
+    import yaml
+
+    # The loader detects the encoding and decodes the raw bytes itself
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=loader)
+
+
 def load_hardware_config(version):
     """Loads the hardware configuration for the given version."""
     config_path = os.path.join(ANSIBLE_DIR, "hardware_vars", f"{version}.yml")
     try:
-        with open(config_path, "r") as f:
-            return yaml.safe_load(f)
+        return load_yaml(config_path)
     except FileNotFoundError:
         logging.error(
             f"Hardware config file not found for version '{version}' at {config_path}"
@@ -73,30 +104,74 @@ def load_hardware_config(version):
         sys.exit(1)
 
 
+@functools.lru_cache(maxsize=1)
+def get_hardware_config():
+    """Returns the hardware configuration for the active hardware version."""
+    return load_hardware_config(get_hardware_version())
+
+
+@functools.lru_cache(maxsize=1)
+def get_compute_nodes():
+    """Returns the compute nodes defined in the active hardware config."""
+    return tuple(get_hardware_config().get("compute_nodes", []))
+
+
+def ensure_ssh_control_dir():
+    """Creates the control socket directory and checks it is private to this user."""
+    os.makedirs(os.path.dirname(SSH_CONTROL_DIR), mode=0o700, exist_ok=True)
+    os.makedirs(SSH_CONTROL_DIR, mode=0o700, exist_ok=True)
+    # An existing directory is accepted as-is by makedirs, so check it isn't a
+    # symlink, someone else's, or writable by anyone but us before trusting its sockets
+    st = os.lstat(SSH_CONTROL_DIR)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        logging.error(
+            f"SSH control directory {SSH_CONTROL_DIR} must be a directory owned by you with mode 0700."
+        )
+        sys.exit(1)
+
+
+def ssh_command():
+    """Returns the base ssh argv, multiplexed over the shared control socket."""
+    return ["ssh", "-F", SSH_CONFIG_FILE, *SSH_MULTIPLEX_OPTIONS]
+
+
 def run_command(
-    command, remote=True, capture_output=False, check=True, suppress_errors=False, remote_host_override=None
+    command, remote=True, capture_output=False, check=True, suppress_errors=False, remote_host_override=None, probe=False
 ):
-    """Runs a command locally or remotely."""
-    remote_host = HARDWARE_CONFIG.get("control_host", "host_not_found")
+    """Runs a command locally or remotely.
+
+    With `probe` set only the exit status is of interest: output is discarded
+    and a failing command is returned rather than raised.
+    """
+    remote_host = get_hardware_config().get("control_host", "host_not_found")
 
     if remote_host_override:
         remote_host = remote_host_override
 
     # Construct the command
     if remote:
-        command = command.replace("'", "'\\''")
-        # The `exec` command ensures that ssh exits with the code of the remote command.
-        cmd_to_run = f"ssh -F {SSH_CONFIG_FILE} {remote_host} 'cd {REMOTE_DIR} && {command}'"
+        # ssh is exec'd directly and the remote login shell is the only one that
+        # parses the command, so it needs no extra layer of quoting
+        cmd_to_run = [*ssh_command(), remote_host, f"cd {REMOTE_DIR} && {command}"]
     else:
         cmd_to_run = command
 
+    # Uncaptured output goes straight to our stdout/stderr, no pipes are created
+    # and only captured output is decoded
+    if probe:
+        check = False
+        output_kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    elif capture_output:
+        output_kwargs = {"capture_output": True, "text": True}
+    else:
+        output_kwargs = {"stdout": None, "stderr": None}
+
     # Execute the command
     logging.debug(f"Executing command: {cmd_to_run}")
     process = subprocess.run(
         cmd_to_run,
-        shell=True,
-        capture_output=capture_output,
-        text=True,
+        shell=not remote,
+        **output_kwargs,
         cwd=PROJECT_ROOT,
     )
 
@@ -116,28 +191,182 @@ def run_command(
     return process
 
 
+def get_tree_signature():
+    """Returns a digest of the path, size, mtime and mode of every file that gets synced."""
+    # The checkout path is included so two checkouts syncing to the same host
+    # never mistake each other's push for their own.
+    digest = hashlib.blake2b(PROJECT_ROOT.encode(), digest_size=16)
+    for root, dirs, files in os.walk(PROJECT_ROOT):
+        dirs[:] = sorted(d for d in dirs if d not in SIGNATURE_SKIP_DIRS)
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            relpath = os.path.relpath(path, PROJECT_ROOT)
+            digest.update(f"{relpath}\0{st.st_size}\0{st.st_mtime_ns}\0{st.st_mode}\n".encode())
+    return digest.hexdigest()
+
+
+def read_local_signature(signature_path):
+    """Returns the tree signature recorded at signature_path, or None if there is none."""
+    try:
+        with open(signature_path, "r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def read_remote_signature(remote_host):
+    """Returns the tree signature last synced to remote_host, or None if it can't be read."""
+    process = subprocess.run(
+        [*ssh_command(), "-T", remote_host, f"cat {REMOTE_SIGNATURE_FILE}"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    if process.returncode != 0:
+        return None
+    return process.stdout.strip()
+
+
+def write_remote_signature(remote_host, signature):
+    """Records on remote_host the tree signature that was just synced to it."""
+    process = subprocess.run(
+        [*ssh_command(), "-T", remote_host, f"printf %s {signature} > {REMOTE_SIGNATURE_FILE}"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        # Not fatal, the next command just syncs again
+        logging.warning(f"Failed to record sync signature on {remote_host}: {process.stderr}")
+
+
+def sync_to_remote(remote_host, force=False):
+    """Syncs the project tree to the remote host unless it is unchanged since the last sync."""
+    if remote_host in SYNCED_REMOTE_HOSTS:
+        return
+
+    signature = get_tree_signature()
+    signature_path = os.path.join(CACHE_DIR, f"last_sync_{remote_host}")
+    if not force and read_local_signature(signature_path) == signature:
+        # The local record only says what this workstation pushed last, so the
+        # remote copy is confirmed too in case it was wiped or pushed from elsewhere
+        if read_remote_signature(remote_host) == signature:
+            logging.info(f"Project unchanged since last sync to {remote_host}, skipping rsync.")
+            SYNCED_REMOTE_HOSTS.add(remote_host)
+            return
+
+    # Rsync is always checked because if it fails, nothing else will work. Only
+    # stderr is kept, the file list on stdout is never looked at.
+    # Light compression keeps rsync network bound rather than cpu bound on the
+    # LAN, and --partial/--inplace let interrupted or changed files reuse the
+    # blocks already on the remote. The remote parent dir is created by the
+    # same ssh session that starts the remote rsync, which also drops the remote
+    # signature so an interrupted sync is never mistaken for a complete one. The
+    # transport needs no tty or X11, and rsync already compresses so ssh
+    # compression is forced off.
+    rsync_cmd = [
+        "rsync",
+        "-e", shlex.join([*ssh_command(), "-T", "-x", "-o", "Compression=no"]),
+        "--rsync-path", f"mkdir -p ~/remote && rm -f {REMOTE_SIGNATURE_FILE} && rsync",
+        "-az", "--compress-level=1", "--partial", "--inplace",
+        "--delete", f"--exclude-from={RSYNC_IGNORE_FILE}",
+        f"{PROJECT_ROOT}/", f"{remote_host}:{REMOTE_DIR}",
+    ]
+    logging.debug(
+        f"Running remote command, first syncing CWD with '{shlex.join(rsync_cmd)}'"
+    )
+    process = subprocess.run(
+        rsync_cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        logging.error(f"Failed to sync {PROJECT_ROOT} to {remote_host}:{REMOTE_DIR}")
+        logging.error(f"Stderr: {process.stderr}")
+        sys.exit(1)
+    SYNCED_REMOTE_HOSTS.add(remote_host)
+
+    write_remote_signature(remote_host, signature)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(signature_path, "w") as f:
+        f.write(signature)
+
+
+def get_tag_options(args):
+    """Returns the ansible-playbook tag selection options given on the command line."""
+    options = ""
+    if args.tags:
+        options += f" --tags {shlex.quote(args.tags)}"
+    if args.skip_tags:
+        options += f" --skip-tags {shlex.quote(args.skip_tags)}"
+    return options
+
+
+def get_ansible_forks():
+    """Returns an ansible fork count large enough to reach every compute node at once."""
+    return max(5, len(get_compute_nodes()))
+
+
+def inventory_is_current():
+    """Checks whether the inventory is newer than everything it is generated from."""
+    sources = [
+        os.path.join(ANSIBLE_DIR, "hardware_vars", f"{get_hardware_version()}.yml"),
+        os.path.join(ANSIBLE_DIR, "vars", "main.yml"),
+        HARDWARE_VERSION_FILE,
+        os.path.realpath(__file__),
+    ]
+    try:
+        inventory_mtime = os.stat(DYN_INVENTORY_PATH).st_mtime_ns
+        return all(os.stat(path).st_mtime_ns < inventory_mtime for path in sources)
+    except FileNotFoundError:
+        return False
+
+
 def generate_inventory():
     """Generates an Ansible inventory from the hardware config file."""
+    if inventory_is_current():
+        logging.info(f"Inventory at {DYN_INVENTORY_PATH} is up to date.")
+        return
     logging.info("Generating inventory from hardware config...")
+    import jinja2
 
     # Load ansible vars
-    vars_path = os.path.join(ANSIBLE_DIR, "vars", "main.yml")
-    with open(vars_path, "r") as f:
-        ansible_vars = yaml.safe_load(f)
+    ansible_vars = load_yaml(os.path.join(ANSIBLE_DIR, "vars", "main.yml"))
 
     # Initialize Jinja2 environment
     env = jinja2.Environment()
 
-    compute_nodes = HARDWARE_CONFIG.get("compute_nodes", [])
-    inventory_lines = []
+    # Compile each distinct IP template once, plain IPs don't need Jinja at all
+    templates = {}
+    compute_nodes = get_compute_nodes()
+    inventory_lines = ["[compute]"]
     for node in compute_nodes:
-        template = env.from_string(node["ip"])
-        rendered_ip = template.render(ansible_vars)
+        ip = node["ip"]
+        if "{{" not in ip:
+            rendered_ip = ip
+        else:
+            if ip not in templates:
+                templates[ip] = env.from_string(ip)
+            rendered_ip = templates[ip].render(ansible_vars)
         inventory_lines.append(f"{node['name']} ansible_host={rendered_ip}")
 
-    inventory_content = "[compute]\n"
-    inventory_content += "\n".join(inventory_lines)
-    inventory_content += "\n\n[compute:vars]\nansible_user=compute\n"
+    inventory_lines += ["", "[compute:vars]", "ansible_user=compute", ""]
+    inventory_content = "\n".join(inventory_lines)
+
+    # Leave unchanged content unwritten, only bump the mtime so the next run can skip
+    # generation. One of the sources changed anyway, so this doesn't add a re-sync
+    try:
+        with open(DYN_INVENTORY_PATH, "r") as f:
+            if f.read() == inventory_content:
+                os.utime(DYN_INVENTORY_PATH)
+                logging.info(f"Inventory at {DYN_INVENTORY_PATH} is up to date.")
+                return
+    except FileNotFoundError:
+        pass
 
     with open(DYN_INVENTORY_PATH, "w") as f:
         f.write(inventory_content)
@@ -150,101 +379,83 @@ def generate_inventory():
 # --- Command Functions ---
 
 
-def get_broadcast_address(args):
-    """Gets the broadcast address for the compute interface using Ansible."""
-
-    command = (
-        f"ansible-playbook ansible/get_broadcast.yml "
-        f"--extra-vars 'hardware_version={get_hardware_version()}'"
-    )
-    try:
-        proc = run_command(command, remote=args.remote, capture_output=True)
-        for line in proc.stdout.split("\n"):
-            if '"msg":' in line:
-                broadcast = line.split('"')[3]
-                logging.info(f"Found broadcast address: {broadcast}")
-                return broadcast
-        logging.error("Could not parse broadcast address from ansible output.")
-        sys.exit(1)
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        logging.error(f"Failed to get broadcast address: {e}")
-        sys.exit(1)
-
-
 def compute_up(args):
     """Brings compute nodes up using Wake-on-LAN."""
     logging.info("Bringing compute nodes up...")
-    macs = [node["mac"] for node in HARDWARE_CONFIG.get("compute_nodes", [])]
-    if not macs:
+    if not get_compute_nodes():
         logging.warning(
             "No compute nodes defined in hardware config. Cannot wake any nodes."
         )
         return
 
-    broadcast_address = get_broadcast_address(args)
+    # Sending the packets and waiting on every node happen in a single playbook run,
+    # the broadcast address is read off the compute interface along the way
     command = (
-        f"ansible-playbook ansible/wol_up.yml "
-        f'--extra-vars \'{{"hardware_version": "{get_hardware_version()}", "broadcast_address": "{broadcast_address}"}}\''
+        f"ansible-playbook -i {DYN_INVENTORY_RELATIVE_PATH} ansible/compute_up.yml "
+        f"--extra-vars 'hardware_version={get_hardware_version()}' "
+        f"--forks {get_ansible_forks()}"
     )
-    print(command)
-    run_command(command, remote=args.remote)
-    logging.info("Wake-on-LAN packets sent.")
+    proc = run_command(command, remote=args.remote, check=False)
+    if proc.returncode != 0:
+        logging.error("Compute nodes failed to wake or become reachable; see the ansible output above.")
+        sys.exit(1)
 
-    logging.info("Waiting for compute nodes to come up...")
-    compute_wait(args)
+    print("All compute nodes are reachable.")
 
 
 def compute_down(args):
     """Shuts down compute nodes."""
     logging.info("Shutting down compute nodes...")
-    command = f'ansible compute -i {DYN_INVENTORY_RELATIVE_PATH} -m shell -a "shutdown now" --become'
-    try:
-        run_command(
-            command, remote=args.remote, suppress_errors=True, capture_output=True
+    # The shutdown module schedules the poweroff and returns before the node drops
+    # off, rather than leaving the connection to be torn down mid-command
+    command = (
+        f"ansible compute -i {DYN_INVENTORY_RELATIVE_PATH} -m community.general.shutdown "
+        f"-a delay=0 -o --become --forks {get_ansible_forks()}"
+    )
+    proc = run_command(command, remote=args.remote, probe=True)
+    if proc.returncode != 0:
+        logging.info(
+            f"SSH connection failed during shutdown (exit code {proc.returncode}), which is expected."
         )
-    except subprocess.CalledProcessError as e:
-        logging.info(f"SSH connection failed during shutdown, which is expected: {e}")
 
 
 def compute_restart(args):
     """Reboots compute nodes."""
     print("Rebooting compute nodes...")
-    command = f'ansible compute -i {DYN_INVENTORY_RELATIVE_PATH} -m shell -a "shutdown -r now" --become'
-    try:
-        run_command(
-            command, remote=args.remote, suppress_errors=True, capture_output=True
+    # Fire and forget: the reboot is started in the background and ansible returns
+    # without waiting on a command whose connection the reboot will cut
+    command = (
+        f'ansible compute -i {DYN_INVENTORY_RELATIVE_PATH} -m shell -a "shutdown -r now" '
+        f"-B 30 -P 0 --become --forks {get_ansible_forks()}"
+    )
+    proc = run_command(command, remote=args.remote, probe=True)
+    if proc.returncode != 0:
+        logging.info(
+            f"SSH connection failed during reboot (exit code {proc.returncode}), which is expected."
         )
-    except subprocess.CalledProcessError as e:
-        logging.info(f"SSH connection failed during reboot, which is expected: {e}")
 
 
 def compute_wait(args):
     """Waits for all compute nodes to become reachable."""
     print("Waiting for all compute nodes to become reachable...")
 
-    compute_nodes = HARDWARE_CONFIG.get("compute_nodes", [])
+    compute_nodes = get_compute_nodes()
     if not compute_nodes:
         logging.warning("No compute nodes defined in hardware config.")
         return 0
 
-    for i in range(100):  # Increased attempts
-        all_statuses = get_all_compute_node_statuses(
-            args.remote, DYN_INVENTORY_RELATIVE_PATH
-        )
-        if all(status == "UP" for status in all_statuses.values()):
-            print("All compute nodes are reachable.")
-            return 0
-
-        down_nodes = [
-            name for name, status in all_statuses.items() if status == "DOWN"
-        ]
-        print(
-            f"Attempt {i + 1}/100 failed. Waiting for: {', '.join(down_nodes)}. Retrying in 1 second..."
-        )
-        time.sleep(1)
+    # Ansible polls every node in parallel from a single process until it can log in
+    command = (
+        f"ansible-playbook -i {DYN_INVENTORY_RELATIVE_PATH} ansible/compute_wait.yml "
+        f"--forks {get_ansible_forks()}"
+    )
+    proc = run_command(command, remote=args.remote, check=False)
+    if proc.returncode != 0:
+        logging.error("Compute nodes failed to become reachable; see the ansible output above.")
+        sys.exit(1)
 
-    logging.error(f"Not all compute nodes were reachable after 100 attempts.")
-    sys.exit(1)
+    print("All compute nodes are reachable.")
+    return 0
 
 
 def compute_configure(args):
@@ -253,7 +464,8 @@ def compute_configure(args):
 
     command = (
         f"ansible-playbook -i {DYN_INVENTORY_RELATIVE_PATH} ansible/compute_configure.yml "
-        f"--extra-vars 'hardware_version={get_hardware_version()}' --become"
+        f"--extra-vars 'hardware_version={get_hardware_version()}' --become "
+        f"--forks {get_ansible_forks()}{get_tag_options(args)}"
     )
     run_command(command, remote=args.remote)
     logging.info("Compute node configuration complete.")
@@ -268,7 +480,8 @@ def compute_test(args):
 
     command = (
         f"ansible-playbook -i {DYN_INVENTORY_RELATIVE_PATH} ansible/compute_test.yml "
-        f"--extra-vars 'hardware_version={get_hardware_version()}' --become"
+        f"--extra-vars 'hardware_version={get_hardware_version()}' --become "
+        f"--forks {get_ansible_forks()}"
     )
     run_command(command, remote=args.remote)
     logging.info("Compute node testing complete.")
@@ -278,28 +491,28 @@ def compute_ssh(args):
     """SSH into a compute node."""
     node_index = args.node_index
     try:
-        node_name = HARDWARE_CONFIG["compute_nodes"][node_index]["name"]
+        node_name = get_compute_nodes()[node_index]["name"]
     except IndexError:
         logging.error(f"Invalid node index: {node_index}")
         sys.exit(1)
 
     if args.remote:
-        remote_host = HARDWARE_CONFIG.get("control_host", "host_not_found")
-        command = f"ssh -F {SSH_CONFIG_FILE} -t {remote_host} 'ssh {node_name}'"
-        # For interactive SSH, we use os.system to hand over control
-        print(f"Connecting to {node_name} via {remote_host}...")
-        os.system(command)
+        remote_host = get_hardware_config().get("control_host", "host_not_found")
+        command = [*ssh_command(), "-t", remote_host, f"ssh {node_name}"]
+        # For interactive SSH, we exec ssh in place of this process to hand over control
+        print(f"Connecting to {node_name} via {remote_host}...", flush=True)
+        os.execvp(command[0], command)
     else:
-        command = f"ssh -F {SSH_CONFIG_FILE} {node_name}"
-        print(f"Connecting to {node_name}...")
-        os.system(command)
+        command = [*ssh_command(), node_name]
+        print(f"Connecting to {node_name}...", flush=True)
+        os.execvp(command[0], command)
 
 
 def compute_cmd(args):
     """Executes a command on a compute node."""
     node_index = args.node_index
     try:
-        node_name = HARDWARE_CONFIG["compute_nodes"][node_index]["name"]
+        node_name = get_compute_nodes()[node_index]["name"]
     except IndexError:
         logging.error(f"Invalid node index: {node_index}")
         sys.exit(1)
@@ -318,10 +531,10 @@ def control_ssh(args):
         print("Already on the control node, no need to SSH.")
         return
 
-    remote_host = HARDWARE_CONFIG.get("control_host", "host_not_found")
-    command = f"ssh -F {SSH_CONFIG_FILE} -t {remote_host}"
-    print(f"Connecting to {remote_host}...")
-    os.system(command)
+    remote_host = get_hardware_config().get("control_host", "host_not_found")
+    command = [*ssh_command(), "-t", remote_host]
+    print(f"Connecting to {remote_host}...", flush=True)
+    os.execvp(command[0], command)
 
 
 def control_configure(args):
@@ -329,6 +542,7 @@ def control_configure(args):
     command = (
         f"ansible-playbook ansible/control_configure.yml "
         f"--extra-vars 'hardware_version={get_hardware_version()}' --become"
+        f"{get_tag_options(args)}"
     )
     print(command)
     run_command(command, remote=args.remote)
@@ -348,45 +562,49 @@ def control_test(args):
 def image_build(args):
     """Builds the golden image using Ansible."""
     logging.info("Building golden image")
+    hardware_version = get_hardware_version()
+    build_host = get_hardware_config().get("build_host", "host_not_found")
     command = (
         f"ansible-playbook ansible/build_image.yml "
-        f"--extra-vars 'hardware_version={get_hardware_version()}' --become"
+        f"--extra-vars 'hardware_version={hardware_version}' --become"
     )
-    run_command(command, remote=args.remote, remote_host_override=HARDWARE_CONFIG.get("build_host", "host_not_found"))
+    run_command(command, remote=args.remote, remote_host_override=build_host)
 
 
     # we have to run this as sudo because the chroot connection requires it
     logging.info("Configuring golden image")
     command = (
         f"sudo -E ansible-playbook ansible/golden_image_configure.yml "
-        f"--extra-vars 'hardware_version={get_hardware_version()}' --become"
+        f"--extra-vars 'hardware_version={hardware_version}' --become"
     )
-    run_command(command, remote=args.remote, remote_host_override=HARDWARE_CONFIG.get("build_host", "host_not_found"))
+    run_command(command, remote=args.remote, remote_host_override=build_host)
 
     # workaround for being unable to run first playbook without sudo. debootstrap hangs when run as user
-    run_command("sudo chown -R $USER:$USER $HOME/.ansible", remote=args.remote, remote_host_override=HARDWARE_CONFIG.get("build_host", "host_not_found"))
+    run_command("sudo chown -R $USER:$USER $HOME/.ansible", remote=args.remote, remote_host_override=build_host)
 
 
 
 def image_clean(args):
     """Removes the golden image on the control node."""
     logging.info("Removing golden image using ansible playbook...")
+    build_host = get_hardware_config().get("build_host", "host_not_found")
     command = (
         f"ansible-playbook ansible/clean_image.yml "
         f"--extra-vars 'hardware_version={get_hardware_version()}'"
     )
-    run_command(command, remote=True, remote_host_override=HARDWARE_CONFIG.get("build_host", "host_not_found"))
+    run_command(command, remote=True, remote_host_override=build_host)
     logging.info("Golden image removed.")
 
 def image_copy(args):
     """Copies hardware image for given hardware version to control host for that hardware version"""
 
     logging.info("copying golden image using ansible playbook...")
+    build_host = get_hardware_config().get("build_host", "host_not_found")
     command = (
         f"ansible-playbook ansible/copy_image.yml "
         f"--extra-vars 'hardware_version={get_hardware_version()}'"
     )
-    run_command(command, remote=True, remote_host_override=HARDWARE_CONFIG.get("build_host", "host_not_found"))
+    run_command(command, remote=True, remote_host_override=build_host)
     logging.info("Golden image copied.")
 
 
@@ -427,26 +645,6 @@ def ansible_test(args):
         os.path.join(project_dir, "roles"),
     ]
 
-    target_path = None
-    for base_path in search_paths:
-        potential_path = os.path.join(base_path, test_name)
-        try:
-            # Check if the directory exists on the remote
-            run_command(f"test -d {potential_path}", remote=args.test_remote, capture_output=True, remote_host_override=ANSIBLE_TESTING_HOST)
-            target_path = potential_path
-            logging.info(f"Found test at  path: {target_path}")
-            break
-        except subprocess.CalledProcessError:
-            continue
-
-    if not target_path:
-        logging.error(f"Molecule test '{test_name}' not found")
-        logging.error("Searched in:")
-        for path in search_paths:
-            logging.error(f"  - {os.path.join(path, test_name)}")
-        sys.exit(1)
-
-
     ## some kind of weird bug in molecule makes it so that the vagrant playbooks cant
     # find the vagrant plugin and so the path has to be manually specified. This seems
     # super broken and bad to me but i couldnt figure it out so instead we do this weird workaround
@@ -457,12 +655,30 @@ def ansible_test(args):
     else:
         venv_dir = f'{PROJECT_ROOT}/.venv'
 
-    # 1. Find the exact module path on the remote machine by searching for the 'modules' directory.
-    find_cmd = f"find {venv_dir}/lib/python*/site-packages/molecule_plugins/vagrant -name 'modules' -type d"
-    proc = run_command(find_cmd, remote=args.test_remote, capture_output=True, remote_host_override=ANSIBLE_TESTING_HOST)
+    # 1. Look for the test directory and the exact module path (by searching for the
+    # 'modules' directory) in one go, so the remote case costs a single ssh round trip.
+    # The existing test directories are printed first, then a separator, then the
+    # find results.
+    potential_paths = " ".join(os.path.join(base_path, test_name) for base_path in search_paths)
+    lookup_cmd = (
+        f'for p in {potential_paths}; do [ -d "$p" ] && echo "$p"; done; '
+        f"echo {LOOKUP_SEPARATOR}; "
+        f"find {venv_dir}/lib/python*/site-packages/molecule_plugins/vagrant -name 'modules' -type d 2>/dev/null"
+    )
+    proc = run_command(lookup_cmd, remote=args.test_remote, capture_output=True, check=False, remote_host_override=ANSIBLE_TESTING_HOST)
+    found_paths, _, module_paths = proc.stdout.partition(f"{LOOKUP_SEPARATOR}\n")
+
+    target_path = found_paths.strip().splitlines()[0] if found_paths.strip() else None
+    if not target_path:
+        logging.error(f"Molecule test '{test_name}' not found")
+        logging.error("Searched in:")
+        for path in search_paths:
+            logging.error(f"  - {os.path.join(path, test_name)}")
+        sys.exit(1)
+    logging.info(f"Found test at  path: {target_path}")
 
     # Take only the first line of output to be safe.
-    module_path = proc.stdout.strip().splitlines()[0] if proc.stdout.strip() else None
+    module_path = module_paths.strip().splitlines()[0] if module_paths.strip() else None
 
     if not module_path:
         logging.error("Could not find the molecule-vagrant module path on the remote.")
@@ -486,7 +702,7 @@ def cluster_configure(args):
 
     # Check compute node status before shutting down
     logging.info("Checking status of compute nodes...")
-    compute_nodes = HARDWARE_CONFIG.get("compute_nodes", [])
+    compute_nodes = get_compute_nodes()
     if not compute_nodes:
         logging.info("No compute nodes defined, skipping shutdown check.")
         compute_nodes_up = False
@@ -507,18 +723,29 @@ def cluster_configure(args):
             "All compute nodes are already down. Proceeding with configuration."
         )
 
-    control_build_image(args)
-    control_configure(args)
-    compute_up(args)
-    compute_wait(args)
-    compute_configure(args)
+    # The image is built and copied on the build host, the rest all runs against
+    # the control host in a single playbook run
+    if args.remote:
+        sync_to_remote(
+            get_hardware_config().get("build_host", "host_not_found"), force=args.force_sync
+        )
+    image_build(args)
+    image_copy(args)
+
+    logging.info("Configuring control node, then waking and configuring compute nodes...")
+    command = (
+        f"ansible-playbook -i {DYN_INVENTORY_RELATIVE_PATH} ansible/cluster_configure.yml "
+        f"--extra-vars 'hardware_version={get_hardware_version()}' --become "
+        f"--forks {get_ansible_forks()}"
+    )
+    run_command(command, remote=args.remote)
     logging.info("--- Full Cluster Configuration Complete ---")
 
 
 def cluster_status(args):
     """Provides a quick status of the entire cluster."""
     print("Compute Nodes:")
-    compute_nodes = HARDWARE_CONFIG.get("compute_nodes", [])
+    compute_nodes = get_compute_nodes()
     if not compute_nodes:
         print("  - No compute nodes defined in hardware config.")
     else:
@@ -536,19 +763,21 @@ def cluster_status(args):
 
 def get_all_compute_node_statuses(remote, inventory_file):
     """Checks the status of all compute hosts at once."""
-    command = f"ansible compute -i {inventory_file} -m ping -o --timeout 3"
+    command = (
+        f"ansible compute -i {inventory_file} -m ping -o --timeout 3 "
+        f"--forks {get_ansible_forks()}"
+    )
     proc = run_command(command, remote=remote, capture_output=True, check=False)
 
     statuses = {}
-    compute_nodes = HARDWARE_CONFIG.get("compute_nodes", [])
+    compute_nodes = get_compute_nodes()
     for node in compute_nodes:
         statuses[node["name"]] = "DOWN"
 
     if proc.stdout:
-        for line in proc.stdout.splitlines():
-            parts = line.split()
-            if len(parts) > 2 and parts[2] == "SUCCESS":
-                hostname = parts[0]
+        for match in PING_RESULT_RE.finditer(proc.stdout):
+            hostname, result = match.groups()
+            if result == "SUCCESS":
                 statuses[hostname] = "UP"
     return statuses
 
@@ -565,6 +794,9 @@ def hardware_set(args):
 
     with open(HARDWARE_VERSION_FILE, "w") as f:
         f.write(version)
+    get_hardware_version.cache_clear()
+    get_hardware_config.cache_clear()
+    get_compute_nodes.cache_clear()
     print(f"Hardware version set to '{version}'.")
 
 
@@ -589,10 +821,10 @@ def cluster_doc(args):
     print("* `down`: Shut down all compute nodes.")
     print("* `restart`: Restart all compute nodes.")
     print("* `wait`: Wait for compute nodes to be reachable.")
-    print("* `configure`: Run Ansible configuration on compute nodes.")
+    print("* `configure [--tags TAGS] [--skip-tags TAGS]`: Run Ansible configuration on compute nodes.")
 
     print("\n## Control Commands (`cluster control ...`)")
-    print("* `configure`: Run Ansible configuration on the control node.")
+    print("* `configure [--tags TAGS] [--skip-tags TAGS]`: Run Ansible configuration on the control node.")
     print("* `cmd <command>`: Executes a command on the control node.")
 
     print("\n## Hardware Commands (`cluster hardware ...`)")
@@ -606,6 +838,16 @@ def cluster_doc(args):
 # --- Main Execution ---
 
 
+def add_tag_arguments(subparser):
+    """Adds the ansible tag selection flags to a configure subparser."""
+    subparser.add_argument(
+        "--tags", help="Only run plays and tasks tagged with these comma separated tags."
+    )
+    subparser.add_argument(
+        "--skip-tags", help="Skip plays and tasks tagged with these comma separated tags."
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Cluster management script.\n\nFor help on a specific command, use: cluster <command> --help",
@@ -624,6 +866,12 @@ def main():
         help="Execute commands on the remote host (default: True).",
     )
 
+    parser.add_argument(
+        "--force-sync",
+        action="store_true",
+        help="Rsync the project to the remote host even if it is unchanged since the last sync.",
+    )
+
     subparsers = parser.add_subparsers(dest="command")
 
     # Top-level commands
@@ -653,9 +901,11 @@ def main():
     compute_subparsers.add_parser(
         "wait", help="Wait for compute nodes to be reachable."
     ).set_defaults(func=compute_wait)
-    compute_subparsers.add_parser(
+    compute_configure_parser = compute_subparsers.add_parser(
         "configure", help="Run Ansible configuration on compute nodes."
-    ).set_defaults(func=compute_configure)
+    )
+    add_tag_arguments(compute_configure_parser)
+    compute_configure_parser.set_defaults(func=compute_configure)
     compute_subparsers.add_parser(
         "test", help="Run Ansible tests on compute nodes."
     ).set_defaults(func=compute_test)
@@ -678,9 +928,11 @@ def main():
     # Control commands
     control_parser = subparsers.add_parser("control", help="Manage the control node.")
     control_subparsers = control_parser.add_subparsers(dest="action", required=True)
-    control_subparsers.add_parser(
+    control_configure_parser = control_subparsers.add_parser(
         "configure", help="Run Ansible configuration on the control node."
-    ).set_defaults(func=control_configure)
+    )
+    add_tag_arguments(control_configure_parser)
+    control_configure_parser.set_defaults(func=control_configure)
     control_subparsers.add_parser(
         "test", help="Run Ansible tests on the control node."
     ).set_defaults(func=control_test)
@@ -749,10 +1001,9 @@ def main():
         sys.exit(0)
 
     if args.command not in ["doc", "hardware"]:
-        version = get_hardware_version()
-        global HARDWARE_CONFIG
-        HARDWARE_CONFIG = load_hardware_config(version)
+        get_hardware_config()
         generate_inventory()
+        ensure_ssh_control_dir()
         if args.remote:
 
             ssh_config_override = os.path.join(PROJECT_ROOT, ".ssh", "config")
@@ -763,23 +1014,13 @@ def main():
             if args.command == "ansible":
                 remote_host = ANSIBLE_TESTING_HOST
             elif args.command == "image":
-                remote_host = HARDWARE_CONFIG.get("build_host", "host_not_found")
+                remote_host = get_hardware_config().get("build_host", "host_not_found")
             else:
-                remote_host = HARDWARE_CONFIG.get("control_host", "host_not_found")
-
-            mkdir_cmd = f"ssh -F {SSH_CONFIG_FILE} {remote_host} 'mkdir -p ~/remote'"
-            subprocess.run(
-                mkdir_cmd, shell=True, check=True, capture_output=True, text=True
-            )
-
-            # Rsync is always checked because if it fails, nothing else will work.
-            rsync_cmd = f"rsync -e 'ssh -F {SSH_CONFIG_FILE}' -avz --delete --exclude='.git' --exclude='.venv' {PROJECT_ROOT}/ {remote_host}:{REMOTE_DIR}"
-            logging.debug(
-                f"Running remote command, first syncing CWD with '{rsync_cmd}'"
-            )
-            subprocess.run(
-                rsync_cmd, shell=True, check=True, capture_output=True, text=True
-            )
+                remote_host = get_hardware_config().get("control_host", "host_not_found")
+
+            # Interactive ssh sessions don't touch the project tree
+            if getattr(args, "action", None) != "ssh":
+                sync_to_remote(remote_host, force=args.force_sync)
 
     args.func(args)
 